@@ -21,8 +21,15 @@ if sys.version_info >= (3, 9):
 else:
     from backports.zoneinfo import ZoneInfo  # pragma: no cover
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
 logger = get_logger(__name__)
 
+_JSON_HEADERS = {"Content-Type": "application/json;charset=utf-8"}
+
 
 def id_for_user(user: User | str) -> str:
     if isinstance(user, User):
@@ -223,7 +230,15 @@ class SlackClient:
             return await self._client.web_client.chat_postMessage(channel=channel_id, text=text, **kwargs)
 
     async def views_open(self, trigger_id: str, view: str, **kwargs: Any) -> AsyncSlackResponse:
-        return await self._client.web_client.views_open(trigger_id=trigger_id, view=view, **kwargs)
+        if orjson is None or not isinstance(view, (str, dict)):
+            return await self._client.web_client.views_open(trigger_id=trigger_id, view=view, **kwargs)
+        # Views can be large, orjson serializes them a lot faster than the json module the SDK uses
+        body = {"trigger_id": trigger_id, "view": view, **kwargs}
+        data = orjson.dumps({key: value for key, value in body.items() if value is not None})
+        # The body is passed to aiohttp as is, which also accepts bytes
+        return await self._client.web_client.api_call(
+            "views.open", data=data, headers=dict(_JSON_HEADERS)  # type: ignore[arg-type]
+        )
 
     async def send_scheduled(
         self, when: datetime, channel: Channel | str, text: str, **kwargs: Any
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from aiohttp import ClientSession
+    from slack_sdk.webhook.async_client import AsyncWebhookClient
+
+_TIMEOUT_SECONDS = 30
+# Responses usually come in bursts, so idle connections and DNS lookups are kept around for a while
+_KEEPALIVE_SECONDS = 60
+_DNS_CACHE_SECONDS = 300
+
+_session: ClientSession | None = None
+
+
+def _get_session() -> ClientSession:
+    from aiohttp import ClientSession, ClientTimeout, TCPConnector
+
+    global _session
+    if _session is None or _session.closed:
+        # The timeout and proxy settings match the sessions AsyncWebhookClient creates when it isn't given one
+        _session = ClientSession(
+            connector=TCPConnector(keepalive_timeout=_KEEPALIVE_SECONDS, ttl_dns_cache=_DNS_CACHE_SECONDS),
+            timeout=ClientTimeout(total=_TIMEOUT_SECONDS),
+            trust_env=False,
+        )
+        # Clients that were created for a closed session can't be used anymore
+        get_webhook_client.cache_clear()
+    return _session
+
+
+@lru_cache(maxsize=256)
+def get_webhook_client(response_url: str) -> AsyncWebhookClient:
+    """Get a webhook client for a response url
+
+    Response urls can be used multiple times, e.g. when a user clicks several buttons in the same message, so the
+    clients are cached. All clients share one HTTP session, so connections to Slack are reused. The webhook client
+    and its HTTP session are only imported and created once the first client is requested.
+
+    :param response_url: the response url to send messages to
+    :return: a webhook client for the response url
+    """
+    from slack_sdk.webhook.async_client import AsyncWebhookClient
+
+    return AsyncWebhookClient(response_url, timeout=_TIMEOUT_SECONDS, session=_get_session())
+
+
+async def close_webhook_session() -> None:
+    """Close the HTTP session shared by all webhook clients, if it was ever created"""
+    global _session
+    if _session is not None:
+        await _session.close()
+        _session = None
+    get_webhook_client.cache_clear()
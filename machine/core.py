@@ -15,14 +15,8 @@ from slack_sdk.socket_mode.aiohttp import SocketModeClient
 from slack_sdk.web.async_client import AsyncWebClient
 
 from machine.clients.slack import SlackClient
-from machine.handlers import (
-    create_message_handler,
-    create_interactive_event_handler,
-    create_view_event_handler,
-    create_generic_event_handler,
-    create_slash_command_handler,
-    log_request,
-)
+from machine.clients.webhook import close_webhook_session
+from machine.handlers import create_request_dispatcher, generate_message_matcher, log_request
 from machine.models.core import (
     InteractiveHandler,
     ViewHandler,
@@ -45,6 +39,7 @@ from machine.settings import import_settings
 from machine.utils.collections import CaseInsensitiveDict
 from machine.utils.logging import configure_logging
 from machine.utils.module_loading import import_string
+from machine.utils.regex import compile_re2, has_multiple_wildcards, re2_available
 
 if sys.version_info >= (3, 9):
     from zoneinfo import ZoneInfo  # pragma: no cover
@@ -92,6 +87,9 @@ class Machine:
             logger.error("No SLACK_BOT_TOKEN found in settings! I need that to work...")
             sys.exit(1)
 
+        if self._settings.get("USE_RE2", False) and not re2_available():
+            logger.warning("USE_RE2 is enabled, but re2 is not installed. Falling back to Python's regex engine.")
+
         # Setup storage
         await self._setup_storage()
 
@@ -232,6 +230,7 @@ class Machine:
             self._registered_actions.process[event] = self._registered_actions.process.get(event, {})
             key = f"{fq_fn_name}-{event}"
             self._registered_actions.process[event][key] = fn
+            self._registered_actions.clear_caches()
         for interactive_config in metadata.plugin_actions.interactive:
             self._register_interactive_handler(
                 class_=cls_instance,
@@ -288,8 +287,19 @@ class Machine:
             regex=matcher_config.regex,
             handle_message_changed=matcher_config.handle_changed_message,
         )
+        assert self._settings is not None
+        linear_matcher = compile_re2(matcher_config.regex) if self._settings.get("USE_RE2", False) else None
+        if linear_matcher is not None:
+            handler.matcher = linear_matcher
+        elif has_multiple_wildcards(matcher_config.regex):
+            logger.warning(
+                "regex contains multiple '.*', which can make matching slow for long messages",
+                regex=matcher_config.regex.pattern,
+                function=fq_fn_name,
+            )
         key = f"{fq_fn_name}-{matcher_config.regex.pattern}"
         getattr(self._registered_actions, type_)[key] = handler
+        self._registered_actions.clear_caches()
         self._help.robot[class_help].append(self._parse_robot_help(matcher_config, type_))
 
     def _register_command_handler(
@@ -389,19 +399,12 @@ class Machine:
         if self._settings.get("LOGLEVEL", "ERROR").upper() == "DEBUG":
             self._client.register_handler(log_request)
 
-        message_handler = create_message_handler(
-            self._registered_actions, self._settings, bot_id, bot_name, self._client
+        # Compile the message matcher once at startup instead of when the handlers are created
+        message_matcher = generate_message_matcher(self._settings)
+        request_dispatcher = create_request_dispatcher(
+            self._registered_actions, self._settings, bot_id, bot_name, self._client, message_matcher=message_matcher
         )
-        interactive_event_handler = create_interactive_event_handler(self._registered_actions, self._client)
-        view_event_handler = create_view_event_handler(self._registered_actions, self._client)
-        generic_event_handler = create_generic_event_handler(self._registered_actions)
-        slash_command_handler = create_slash_command_handler(self._registered_actions, self._client)
-
-        self._client.register_handler(message_handler)
-        self._client.register_handler(interactive_event_handler)
-        self._client.register_handler(view_event_handler)
-        self._client.register_handler(generic_event_handler)
-        self._client.register_handler(slash_command_handler)
+        self._client.register_handler(request_dispatcher)
         # Establish a WebSocket connection to the Socket Mode servers
         await self._socket_mode_client.connect()
         logger.info("Connected to Slack")
@@ -413,5 +416,5 @@ class Machine:
         await asyncio.sleep(float("inf"))
 
     async def close(self) -> None:
-        closables = [self._socket_mode_client.close(), self._storage_backend.close()]
+        closables = [self._socket_mode_client.close(), self._storage_backend.close(), close_webhook_session()]
         await asyncio.gather(*closables)
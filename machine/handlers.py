@@ -2,17 +2,18 @@ from __future__ import annotations
 
 import asyncio
 import re
-from typing import Any, Callable, Awaitable, Mapping, cast, AsyncGenerator, Union
+from functools import lru_cache
+from typing import Any, Callable, Awaitable, Mapping, cast, AsyncGenerator, Union, Sequence
 
 from slack_sdk.models import JsonObject
-from structlog.stdlib import get_logger, BoundLogger
+from structlog.stdlib import get_logger
 
 from slack_sdk.socket_mode.async_client import AsyncBaseSocketModeClient
 from slack_sdk.socket_mode.request import SocketModeRequest
 from slack_sdk.socket_mode.response import SocketModeResponse
 
 from machine.clients.slack import SlackClient
-from machine.models.core import RegisteredActions, MessageHandler
+from machine.models.core import RegisteredActions, MessageHandler, CommandHandler
 from machine.plugins.interactive import Interactive
 from machine.plugins.view import View
 from machine.plugins.command import Command
@@ -20,6 +21,8 @@ from machine.plugins.message import Message
 
 logger = get_logger(__name__)
 
+CommandDispatcher = Callable[[Command, SocketModeRequest, AsyncBaseSocketModeClient], Awaitable[None]]
+
 
 def create_message_handler(
     plugin_actions: RegisteredActions,
@@ -27,73 +30,115 @@ def create_message_handler(
     bot_id: str,
     bot_name: str,
     slack_client: SlackClient,
+    message_matcher: re.Pattern[str] | None = None,
 ) -> Callable[[AsyncBaseSocketModeClient, SocketModeRequest], Awaitable[None]]:
-    message_matcher = generate_message_matcher(settings)
+    process_message_event = _create_message_event_processor(
+        plugin_actions, settings, bot_id, bot_name, slack_client, message_matcher
+    )
 
     async def handle_message_request(client: AsyncBaseSocketModeClient, request: SocketModeRequest) -> None:
         if request.type == "events_api":
             # Acknowledge the request anyway
             response = SocketModeResponse(envelope_id=request.envelope_id)
-            # Don't forget having await for method calls
             await client.send_socket_mode_response(response)
-
-            # only process message events
-            if request.payload["event"]["type"] == "message":
-                await handle_message(
-                    event=request.payload["event"],
-                    bot_name=bot_name,
-                    bot_id=bot_id,
-                    plugin_actions=plugin_actions,
-                    message_matcher=message_matcher,
-                    slack_client=slack_client,
-                    log_handled_message=settings["LOG_HANDLED_MESSAGES"],
-                    force_user_lookup=settings["FORCE_USER_LOOKUP"],
-                )
+            await process_message_event(request.payload["event"])
 
     return handle_message_request
 
 
+def _create_message_event_processor(
+    plugin_actions: RegisteredActions,
+    settings: Mapping,
+    bot_id: str,
+    bot_name: str,
+    slack_client: SlackClient,
+    message_matcher: re.Pattern[str] | None = None,
+) -> Callable[[dict[str, Any]], Awaitable[None]]:
+    matcher = message_matcher or generate_message_matcher(settings)
+    aliases = _parse_aliases(settings)
+
+    async def process_message_event(event: dict[str, Any]) -> None:
+        # only process message events, and only when there are plugins listening for messages
+        if event["type"] != "message":
+            return
+        if not plugin_actions.listen_to and not plugin_actions.respond_to:
+            return
+        await handle_message(
+            event=event,
+            bot_name=bot_name,
+            bot_id=bot_id,
+            plugin_actions=plugin_actions,
+            message_matcher=matcher,
+            slack_client=slack_client,
+            log_handled_message=settings["LOG_HANDLED_MESSAGES"],
+            force_user_lookup=settings["FORCE_USER_LOOKUP"],
+            aliases=aliases,
+        )
+
+    return process_message_event
+
+
 def create_slash_command_handler(
     plugin_actions: RegisteredActions,
     slack_client: SlackClient,
 ) -> Callable[[AsyncBaseSocketModeClient, SocketModeRequest], Awaitable[None]]:
+    # Dispatch functions are resolved once per command handler, instead of once per request
+    dispatchers: dict[str, tuple[CommandHandler, CommandDispatcher]] = {}
+
     async def handle_slash_command_request(client: AsyncBaseSocketModeClient, request: SocketModeRequest) -> None:
         if request.type == "slash_commands":
             logger.debug("slash command received", payload=request.payload)
             # We only acknowledge request if we know about this command
-            if request.payload["command"] in plugin_actions.command:
-                cmd = plugin_actions.command[request.payload["command"]]
+            command = request.payload["command"]
+            if command in plugin_actions.command:
+                cmd = plugin_actions.command[command]
+                resolved = dispatchers.get(command)
+                if resolved is None or resolved[0] is not cmd:
+                    resolved = dispatchers[command] = (cmd, _create_command_dispatcher(cmd))
                 command_obj = _gen_command(request.payload, slack_client)
-                if "logger" in cmd.function_signature.parameters:
-                    command_logger = create_scoped_logger(
-                        cmd.class_name, cmd.function.__name__, command_obj.sender.id, command_obj.sender.name
-                    )
-                    extra_args = {"logger": command_logger}
-                else:
-                    extra_args = {}
-                # Check if the handler is a generator. In this case we have an immediate response we can send back
-                if cmd.is_generator:
-                    gen_fn = cast(Callable[..., AsyncGenerator[Union[dict, JsonObject, str], None]], cmd.function)
-                    logger.debug("Slash command handler is generator, returning immediate ack")
-                    gen = gen_fn(command_obj, **extra_args)
-                    # return immediate reponse
-                    payload = await gen.__anext__()
-                    ack_response = SocketModeResponse(envelope_id=request.envelope_id, payload=payload)
-                    await client.send_socket_mode_response(ack_response)
-                    # Now run the rest of the function
-                    try:
-                        await gen.__anext__()
-                    except StopAsyncIteration:
-                        pass
-                else:
-                    ack_response = SocketModeResponse(envelope_id=request.envelope_id)
-                    await client.send_socket_mode_response(ack_response)
-                    fn = cast(Callable[..., Awaitable[None]], cmd.function)
-                    await fn(command_obj, **extra_args)
+                await resolved[1](command_obj, request, client)
 
     return handle_slash_command_request
 
 
+def _create_command_dispatcher(cmd: CommandHandler) -> CommandDispatcher:
+    def extra_args(command_obj: Command) -> dict[str, Any]:
+        if not cmd.needs_logger:
+            return {}
+        command_logger = cmd.base_logger.bind(user_id=command_obj.sender.id, user_name=command_obj.sender.name)
+        return {"logger": command_logger}
+
+    # Check if the handler is a generator. In this case we have an immediate response we can send back
+    if cmd.is_generator:
+        gen_fn = cast(Callable[..., AsyncGenerator[Union[dict, JsonObject, str], None]], cmd.function)
+
+        async def dispatch_generator(
+            command_obj: Command, request: SocketModeRequest, client: AsyncBaseSocketModeClient
+        ) -> None:
+            logger.debug("Slash command handler is generator, returning immediate ack")
+            gen = gen_fn(command_obj, **extra_args(command_obj))
+            # return immediate reponse
+            payload = await gen.__anext__()
+            ack_response = SocketModeResponse(envelope_id=request.envelope_id, payload=payload)
+            await client.send_socket_mode_response(ack_response)
+            # Now run the rest of the function
+            try:
+                await gen.__anext__()
+            except StopAsyncIteration:
+                pass
+
+        return dispatch_generator
+
+    fn = cast(Callable[..., Awaitable[None]], cmd.function)
+
+    async def dispatch(command_obj: Command, request: SocketModeRequest, client: AsyncBaseSocketModeClient) -> None:
+        ack_response = SocketModeResponse(envelope_id=request.envelope_id)
+        await client.send_socket_mode_response(ack_response)
+        await fn(command_obj, **extra_args(command_obj))
+
+    return dispatch
+
+
 def create_generic_event_handler(
     plugin_actions: RegisteredActions,
 ) -> Callable[[AsyncBaseSocketModeClient, SocketModeRequest], Awaitable[None]]:
@@ -101,18 +146,70 @@ def create_generic_event_handler(
         if request.type == "events_api":
             # Acknowledge the request anyway
             response = SocketModeResponse(envelope_id=request.envelope_id)
-            # Don't forget having await for method calls
             await client.send_socket_mode_response(response)
-
-            # only process message events
-            if request.payload["event"]["type"] in plugin_actions.process:
-                await dispatch_event_handlers(
-                    request.payload["event"], list(plugin_actions.process[request.payload["event"]["type"]].values())
-                )
+            await _process_generic_event(plugin_actions, request.payload["event"])
 
     return handle_event_request
 
 
+async def _process_generic_event(plugin_actions: RegisteredActions, event: dict[str, Any]) -> None:
+    # only process events that plugins registered for
+    event_handlers = plugin_actions.event_handlers(event["type"])
+    if not event_handlers:
+        return
+    await dispatch_event_handlers(event, event_handlers)
+
+
+def create_request_dispatcher(
+    plugin_actions: RegisteredActions,
+    settings: Mapping,
+    bot_id: str,
+    bot_name: str,
+    slack_client: SlackClient,
+    message_matcher: re.Pattern[str] | None = None,
+) -> Callable[[AsyncBaseSocketModeClient, SocketModeRequest], Awaitable[None]]:
+    """Create one Socket Mode request handler that routes each request straight to the handler for its type
+
+    This replaces registering the message, generic event, slash command, interactive and view handlers
+    separately, in which case every request would pass through all of them.
+    """
+    process_message_event = _create_message_event_processor(
+        plugin_actions, settings, bot_id, bot_name, slack_client, message_matcher
+    )
+
+    async def handle_message_event_request(client: AsyncBaseSocketModeClient, request: SocketModeRequest) -> None:
+        # Acknowledge the request anyway
+        response = SocketModeResponse(envelope_id=request.envelope_id)
+        await client.send_socket_mode_response(response)
+        event = request.payload["event"]
+        # Messages are both handled by message handlers and by event processors, a failure in one shouldn't block
+        # the other
+        try:
+            await process_message_event(event)
+        finally:
+            await _process_generic_event(plugin_actions, event)
+
+    routes: dict[tuple[str, str | None], Callable[[AsyncBaseSocketModeClient, SocketModeRequest], Awaitable[None]]]
+    routes = {
+        ("events_api", "message"): handle_message_event_request,
+        ("events_api", None): create_generic_event_handler(plugin_actions),
+        ("slash_commands", None): create_slash_command_handler(plugin_actions, slack_client),
+        ("interactive", "block_actions"): create_interactive_event_handler(plugin_actions, slack_client),
+        ("interactive", "view_submission"): create_view_event_handler(plugin_actions, slack_client),
+    }
+
+    async def dispatch_request(client: AsyncBaseSocketModeClient, request: SocketModeRequest) -> None:
+        payload = request.payload
+        request_type = request.type
+        subtype = payload["event"]["type"] if request_type == "events_api" else payload.get("type")
+        # fall back to the catch-all route for the request type, e.g. events that aren't messages
+        route = routes.get((request_type, subtype)) or routes.get((request_type, None))
+        if route is not None:
+            await route(client, request)
+
+    return dispatch_request
+
+
 async def log_request(_: AsyncBaseSocketModeClient, request: SocketModeRequest) -> None:
     logger.debug("Request received", type=request.type, request=request.to_dict())
 
@@ -176,10 +273,22 @@ def create_view_event_handler(
 
 
 def generate_message_matcher(settings: Mapping) -> re.Pattern[str]:
+    """Get the pattern that matches messages addressed to the bot
+
+    Matchers are compiled once per distinct ``ALIASES`` setting and shared afterwards.
+
+    :param settings: the settings of the bot
+    :return: the compiled message matcher
+    """
+    return _compile_message_matcher(settings["ALIASES"] if "ALIASES" in settings else None)
+
+
+@lru_cache(maxsize=None)
+def _compile_message_matcher(aliases: str | None) -> re.Pattern[str]:
     alias_regex = ""
-    if "ALIASES" in settings:
-        logger.debug("Setting aliases to %s", settings["ALIASES"])
-        alias_alternatives = "|".join([re.escape(alias) for alias in settings["ALIASES"].split(",")])
+    if aliases is not None:
+        logger.debug("Setting aliases to %s", aliases)
+        alias_alternatives = "|".join([re.escape(alias) for alias in aliases.split(",")])
         alias_regex = f"|(?P<alias>{alias_alternatives})"
     return re.compile(
         rf"^(?:<@(?P<atuser>\w+)>:?|(?P<username>\w+):{alias_regex}) ?(?P<text>.*)$",
@@ -196,62 +305,86 @@ async def handle_message(
     slack_client: SlackClient,
     log_handled_message: bool,
     force_user_lookup: bool,
+    aliases: tuple[str, ...] | None = None,
 ) -> None:
     # Handle message subtype 'message_changed' to allow the bot to respond to edits
-    if "subtype" in event and event["subtype"] == "message_changed":
-        channel_type = event["channel_type"]
-        channel = event["channel"]
-        event = event["message"]
-        event["channel_type"] = channel_type
-        event["channel"] = channel
-        event["subtype"] = "message_changed"
-    if "user" in event and not event["user"] == bot_id:
-        listeners = list(plugin_actions.listen_to.values())
+    if event.get("subtype") == "message_changed":
+        inner = event["message"]
+        inner["channel_type"] = event["channel_type"]
+        inner["channel"] = event["channel"]
+        inner["subtype"] = "message_changed"
+        event = inner
+    # Events without a user are ignored just like the bot's own messages
+    if event.get("user", bot_id) != bot_id:
         respond_to_msg = _check_bot_mention(
             event,
             bot_name,
             bot_id,
             message_matcher,
+            aliases,
         )
+        listeners, prefilter = plugin_actions.listeners(include_respond_to=bool(respond_to_msg))
         if respond_to_msg:
-            listeners += list(plugin_actions.respond_to.values())
-            await dispatch_listeners(respond_to_msg, listeners, slack_client, log_handled_message, force_user_lookup)
+            await dispatch_listeners(
+                respond_to_msg, listeners, slack_client, log_handled_message, force_user_lookup, prefilter
+            )
         else:
-            await dispatch_listeners(event, listeners, slack_client, log_handled_message, force_user_lookup)
+            await dispatch_listeners(event, listeners, slack_client, log_handled_message, force_user_lookup, prefilter)
 
 
 def _check_bot_mention(
-    event: dict[str, Any], bot_name: str, bot_id: str, message_matcher: re.Pattern[str]
+    event: dict[str, Any],
+    bot_name: str,
+    bot_id: str,
+    message_matcher: re.Pattern[str],
+    aliases: tuple[str, ...] | None = None,
 ) -> dict[str, Any] | None:
     full_text = event.get("text", "")
     channel_type = event["channel_type"]
-    m = message_matcher.match(full_text)
 
-    if channel_type == "channel" or channel_type == "group":
-        if not m:
-            return None
+    if channel_type != "channel" and channel_type != "group":
+        # In DMs the bot doesn't need to be addressed, we only strip the prefix if there is one. Most DMs don't
+        # have one, so we rule that out with cheap string checks before running the matcher.
+        if _may_have_prefix(full_text, aliases):
+            m = message_matcher.match(full_text)
+            if m:
+                event["text"] = m.groupdict().get("text", None)
+        return event
+
+    m = message_matcher.match(full_text)
+    if not m:
+        return None
 
-        matches = m.groupdict()
+    matches = m.groupdict()
 
-        atuser = matches.get("atuser")
-        username = matches.get("username")
-        text = matches.get("text")
-        alias = matches.get("alias")
+    atuser = matches.get("atuser")
+    username = matches.get("username")
+    text = matches.get("text")
+    alias = matches.get("alias")
 
-        if alias:
-            atuser = bot_id
+    if alias:
+        atuser = bot_id
 
-        if atuser != bot_id and username != bot_name:
-            # a channel message at other user
-            return None
+    if atuser != bot_id and username != bot_name:
+        # a channel message at other user
+        return None
 
-        event["text"] = text
-    else:
-        if m:
-            event["text"] = m.groupdict().get("text", None)
+    event["text"] = text
     return event
 
 
+def _may_have_prefix(text: str, aliases: tuple[str, ...] | None) -> bool:
+    # Mentions start with "<@" and username prefixes end with ":". Without knowing the aliases, any text may
+    # start with one.
+    if aliases is None:
+        return True
+    return text.startswith("<@") or ":" in text or text.startswith(aliases)
+
+
+def _parse_aliases(settings: Mapping) -> tuple[str, ...]:
+    return tuple(settings["ALIASES"].split(",")) if "ALIASES" in settings else ()
+
+
 def _gen_message(event: dict[str, Any], slack_client: SlackClient) -> Message:
     return Message(slack_client, event)
 
@@ -274,39 +407,48 @@ async def dispatch_listeners(
     slack_client: SlackClient,
     log_handled_message: bool,
     force_user_lookup: bool,
+    prefilter: re.Pattern[str] | None = None,
 ) -> None:
+    if event.get("subtype") == "message_changed":
+        message_handlers = [handler for handler in message_handlers if handler.handle_message_changed]
+    if not message_handlers:
+        return
+    text = event.get("text", "")
+    # The pre-filter matches if any of the handler patterns would match, so we can bail out early
+    if prefilter is not None and not prefilter.search(text):
+        return
     handler_funcs = []
+    # The message is shared by all matching handlers, and only created once a handler matches
+    message: Message | None = None
     for handler in message_handlers:
-        matcher = handler.regex
-        if "subtype" in event and event["subtype"] == "message_changed" and not handler.handle_message_changed:
-            continue
-        match = matcher.search(event.get("text", ""))
+        match = handler.matcher.search(text)
         if match:
-            if force_user_lookup and event["user"] not in slack_client.users:
-                user = await slack_client.get_user(event["user"])
-            message = _gen_message(event, slack_client)
+            if message is None:
+                user_id = event.get("user")
+                if force_user_lookup and user_id and user_id not in slack_client.users:
+                    await slack_client.get_user(user_id)
+                message = _gen_message(event, slack_client)
             extra_params = {**match.groupdict()}
-            handler_logger = create_scoped_logger(
-                handler.class_name, handler.function.__name__, message.sender.id, message.sender.name
-            )
-            if log_handled_message:
-                handler_logger.info("Handling message", message=message.text)
-            if "logger" in handler.function_signature.parameters:
-                extra_params["logger"] = handler_logger
+            # Only bind a logger when it will actually be used
+            if log_handled_message or handler.needs_logger:
+                handler_logger = handler.base_logger.bind(user_id=message.sender.id, user_name=message.sender.name)
+                if log_handled_message:
+                    handler_logger.info("Handling message", message=message.text)
+                if handler.needs_logger:
+                    extra_params["logger"] = handler_logger
             handler_funcs.append(handler.function(message, **extra_params))
-    await asyncio.gather(*handler_funcs)
-    return
+    await _run_concurrently(handler_funcs)
 
 
 async def dispatch_event_handlers(
-    event: dict[str, Any], event_handlers: list[Callable[[dict[str, Any]], Awaitable[None]]]
+    event: dict[str, Any], event_handlers: Sequence[Callable[[dict[str, Any]], Awaitable[None]]]
 ) -> None:
-    handler_funcs = [f(event) for f in event_handlers]
-    await asyncio.gather(*handler_funcs)
+    await _run_concurrently([f(event) for f in event_handlers])
 
 
-def create_scoped_logger(class_name: str, function_name: str, user_id: str, user_name: str) -> BoundLogger:
-    fq_fn_name = f"{class_name}.{function_name}"
-    handler_logger = get_logger(fq_fn_name)
-    handler_logger = handler_logger.bind(user_id=user_id, user_name=user_name)
-    return handler_logger
+async def _run_concurrently(coros: Sequence[Awaitable[None]]) -> None:
+    # Most events are handled by a single handler, which can be awaited directly without wrapping it in a task
+    if len(coros) == 1:
+        await coros[0]
+    elif coros:
+        await asyncio.gather(*coros)
@@ -1,27 +1,39 @@
 from __future__ import annotations
 import re
+import sys
 from dataclasses import dataclass, field
 from typing import Callable, Any, Awaitable, AsyncGenerator
 from inspect import Signature
 
 from slack_sdk.models import JsonObject
+from structlog.stdlib import get_logger, BoundLogger
 
 from machine.plugins.base import MachineBasePlugin
+from machine.utils.regex import combine_patterns, compile_re2
 
+# Slots avoid a __dict__ per instance and speed up attribute access, but dataclasses only support them on
+# Python 3.10+
+_DATACLASS_OPTIONS: dict[str, Any] = {"slots": True} if sys.version_info >= (3, 10) else {}
 
-@dataclass
+
+def _handler_logger(class_name: str, function: Callable[..., Any], signature: Signature) -> tuple[bool, BoundLogger]:
+    # Whether the handler accepts a logger, and the logger to bind per invocation, are only determined once
+    return "logger" in signature.parameters, get_logger(f"{class_name}.{function.__name__}")
+
+
+@dataclass(**_DATACLASS_OPTIONS)
 class HumanHelp:
     command: str
     help: str
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class Manual:
     human: dict[str, dict[str, HumanHelp]]
     robot: dict[str, list[str]]
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class MessageHandler:
     class_: MachineBasePlugin
     class_name: str
@@ -29,9 +41,17 @@ class MessageHandler:
     function_signature: Signature
     regex: re.Pattern[str]
     handle_message_changed: bool
+    needs_logger: bool = field(init=False, repr=False)
+    base_logger: BoundLogger = field(init=False, repr=False, compare=False)
+    # Pattern used for matching messages. This is `regex`, unless it was replaced by a linear-time re2 equivalent
+    matcher: re.Pattern[str] = field(init=False, repr=False)
 
+    def __post_init__(self) -> None:
+        self.needs_logger, self.base_logger = _handler_logger(self.class_name, self.function, self.function_signature)
+        self.matcher = self.regex
 
-@dataclass
+
+@dataclass(**_DATACLASS_OPTIONS)
 class CommandHandler:
     class_: MachineBasePlugin
     class_name: str
@@ -39,9 +59,14 @@ class CommandHandler:
     function_signature: Signature
     command: str
     is_generator: bool
+    needs_logger: bool = field(init=False, repr=False)
+    base_logger: BoundLogger = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self.needs_logger, self.base_logger = _handler_logger(self.class_name, self.function, self.function_signature)
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class InteractiveHandler:
     class_: MachineBasePlugin
     class_name: str
@@ -50,7 +75,7 @@ class InteractiveHandler:
     action_id: str
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class ViewHandler:
     class_: MachineBasePlugin
     class_name: str
@@ -59,7 +84,7 @@ class ViewHandler:
     callback_id: str
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class RegisteredActions:
     listen_to: dict[str, MessageHandler] = field(default_factory=dict)
     respond_to: dict[str, MessageHandler] = field(default_factory=dict)
@@ -67,3 +92,49 @@ class RegisteredActions:
     view: dict[str, ViewHandler] = field(default_factory=dict)
     process: dict[str, dict[str, Callable[[dict[str, Any]], Awaitable[None]]]] = field(default_factory=dict)
     command: dict[str, CommandHandler] = field(default_factory=dict)
+    _listeners_cache: dict[bool, tuple[list[MessageHandler], re.Pattern[str] | None]] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+    _event_handlers_cache: dict[str, tuple[Callable[[dict[str, Any]], Awaitable[None]], ...]] = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+
+    def clear_caches(self) -> None:
+        """Clear lookup structures derived from the registered actions
+
+        Must be called whenever the registered actions change.
+        """
+        self._listeners_cache.clear()
+        self._event_handlers_cache.clear()
+
+    def listeners(self, include_respond_to: bool) -> tuple[list[MessageHandler], re.Pattern[str] | None]:
+        """Message handlers that should receive a message, and a pre-filter for their patterns
+
+        :param include_respond_to: whether to include the `respond_to` handlers besides the `listen_to` handlers
+        :return: the message handlers and a pattern that matches whenever any of their patterns match, or ``None``
+            if no such pattern could be built
+        """
+        cached = self._listeners_cache.get(include_respond_to)
+        if cached is None:
+            handlers = list(self.listen_to.values())
+            if include_respond_to:
+                handlers += list(self.respond_to.values())
+            prefilter = combine_patterns(handler.regex for handler in handlers)
+            # Don't let a backtracking pre-filter undo the guarantees of handlers that match in linear time
+            if prefilter is not None and any(handler.matcher is not handler.regex for handler in handlers):
+                prefilter = compile_re2(prefilter)
+            cached = (handlers, prefilter)
+            self._listeners_cache[include_respond_to] = cached
+        return cached
+
+    def event_handlers(self, event_type: str) -> tuple[Callable[[dict[str, Any]], Awaitable[None]], ...]:
+        """Functions that process events of a specific type
+
+        :param event_type: the type of the event
+        :return: the functions that process events of the type, empty if there are none
+        """
+        cached = self._event_handlers_cache.get(event_type)
+        if cached is None:
+            cached = tuple(self.process.get(event_type, {}).values())
+            self._event_handlers_cache[event_type] = cached
+        return cached
@@ -1,15 +1,17 @@
 from __future__ import annotations
 
-from typing import Any, Sequence
+from typing import TYPE_CHECKING, Any, Sequence
 
 from slack_sdk.models.attachments import Attachment
 from slack_sdk.models.blocks import Block
-from slack_sdk.webhook import WebhookResponse
-from slack_sdk.webhook.async_client import AsyncWebhookClient
 
 from machine.clients.slack import SlackClient
+from machine.clients.webhook import get_webhook_client
 from machine.models import User, Channel
 
+if TYPE_CHECKING:
+    from slack_sdk.webhook import WebhookResponse
+
 
 class Command:
     """A Slack command that was received by the bot
@@ -27,7 +29,6 @@ class Command:
     def __init__(self, client: SlackClient, cmd_payload: dict[str, Any]):
         self._client = client
         self._cmd_payload = cmd_payload
-        self._webhook_client = AsyncWebhookClient(self._cmd_payload["response_url"])
 
     @property
     def sender(self) -> User:
@@ -123,6 +124,7 @@ class Command:
         else:
             response_type = "in_channel"
 
-        return await self._webhook_client.send(
+        webhook_client = get_webhook_client(self._cmd_payload["response_url"])
+        return await webhook_client.send(
             text=text, attachments=attachments, blocks=blocks, response_type=response_type, **kwargs
         )
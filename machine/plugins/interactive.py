@@ -1,16 +1,18 @@
 from __future__ import annotations
 
-from typing import Any, Sequence, List
+from typing import TYPE_CHECKING, Any, Sequence, List
 
 from slack_sdk.models.attachments import Attachment
 from slack_sdk.models.blocks import Block
-from slack_sdk.webhook import WebhookResponse
-from slack_sdk.webhook.async_client import AsyncWebhookClient
 from slack_sdk.web.async_slack_response import AsyncSlackResponse
 
 from machine.clients.slack import SlackClient
+from machine.clients.webhook import get_webhook_client
 from machine.models import User, Channel
 
+if TYPE_CHECKING:
+    from slack_sdk.webhook import WebhookResponse
+
 
 class Interactive:
     """A Slack interactive message that was received by the bot
@@ -28,7 +30,6 @@ class Interactive:
     def __init__(self, client: SlackClient, cmd_payload: dict[str, Any]):
         self._client = client
         self._cmd_payload = cmd_payload
-        self._webhook_client = AsyncWebhookClient(self._cmd_payload["response_url"])
 
     @property
     def sender(self) -> User:
@@ -57,11 +58,11 @@ class Interactive:
 
         :return: the state (dict) of the actual message
         """
-        return (
-            self._cmd_payload["state"]
-            if "state" in self._cmd_payload
-            else self._cmd_payload["view"]["state"] if "view" in self._cmd_payload else None
-        )
+        payload = self._cmd_payload
+        state = payload.get("state")
+        if state is not None:
+            return state
+        return (payload.get("view") or {}).get("state")
 
     @property
     def view(self) -> dict[str, Any] | None:
@@ -189,7 +190,8 @@ class Interactive:
         else:
             response_type = "in_channel"
 
-        return await self._webhook_client.send(
+        webhook_client = get_webhook_client(self._cmd_payload["response_url"])
+        return await webhook_client.send(
             text=text, attachments=attachments, blocks=blocks, response_type=response_type, **kwargs
         )
 
@@ -1,19 +1,24 @@
 from __future__ import annotations
 
-from typing import Any, Sequence, List
+from typing import TYPE_CHECKING, Any, Sequence, List
 from structlog.stdlib import get_logger
 
 from slack_sdk.models.attachments import Attachment
 from slack_sdk.models.blocks import Block
 from slack_sdk.web.async_slack_response import AsyncSlackResponse
-from slack_sdk.webhook import WebhookResponse
-from slack_sdk.webhook.async_client import AsyncWebhookClient
 
 from machine.clients.slack import SlackClient
+from machine.clients.webhook import get_webhook_client
 from machine.models import User, Channel
 
+if TYPE_CHECKING:
+    from slack_sdk.webhook import WebhookResponse
+
 logger = get_logger(__name__)
 
+# Public channels start with a C, private channels with a G
+_NON_DM_PREFIXES = frozenset("CG")
+
 
 class View:
     """A Slack interactive view message that was received by the bot
@@ -26,16 +31,25 @@ class View:
     The `View` class also contains convenience methods
     """
 
+    # Views are created for every view submission, so they don't need a __dict__
+    __slots__ = ("_client", "_cmd_payload", "_user_id", "_view", "_state", "_trigger_id", "_response_url")
+
     # TODO: create proper class for cmd_event
     def __init__(self, client: SlackClient, cmd_payload: dict[str, Any]):
         self._client = client
         self._cmd_payload = cmd_payload
-        if "response_urls" in self._cmd_payload and len(self._cmd_payload["response_urls"]) > 0:
-            response_url = self._cmd_payload["response_urls"][0]["response_url"]
+        # Look up the fields every view submission has once, instead of on every access
+        self._user_id: str = cmd_payload["user"]["id"]
+        self._view: dict[str, Any] | None = cmd_payload.get("view")
+        self._state: dict[str, Any] | None = (self._view or {}).get("state")
+        self._trigger_id: str = cmd_payload["trigger_id"]
+        response_urls = cmd_payload.get("response_urls")
+        if response_urls:
+            response_url = response_urls[0]["response_url"]
             logger.debug(f"Response URL = {response_url}")
-            self._webhook_client = AsyncWebhookClient(response_url)
+            self._response_url: str | None = response_url
         else:
-            self._webhook_client = None
+            self._response_url = None
 
     @property
     def sender(self) -> User:
@@ -43,7 +57,7 @@ class View:
 
         :return: the User the message was sent by
         """
-        return self._client.users[self._cmd_payload["user"]["id"]]
+        return self._client.users[self._user_id]
 
     @property
     def channel(self) -> Channel:
@@ -55,8 +69,7 @@ class View:
 
     @property
     def is_dm(self) -> bool:
-        channel_id = self._cmd_payload["channel"]["id"]
-        return not (channel_id.startswith("C") or channel_id.startswith("G"))
+        return self._cmd_payload["channel"]["id"][:1] not in _NON_DM_PREFIXES
 
     @property
     def state(self) -> dict[str, Any] | None:
@@ -64,7 +77,7 @@ class View:
 
         :return: the state (dict) of the actual message
         """
-        return self._cmd_payload.get("view", {}).get("state")
+        return self._state
 
     @property
     def view(self) -> dict[str, Any] | None:
@@ -72,7 +85,7 @@ class View:
 
         :return: the view (dict) of the actual message
         """
-        return self._cmd_payload.get("view")
+        return self._view
 
     @property
     def trigger_id(self) -> str:
@@ -82,7 +95,7 @@ class View:
 
         :return: the trigger id associated with the command
         """
-        return self._cmd_payload["trigger_id"]
+        return self._trigger_id
 
     async def say(
         self,
@@ -112,7 +125,7 @@ class View:
 
         """
 
-        if not self._webhook_client:
+        if not self._response_url:
             return None
 
         if ephemeral:
@@ -120,7 +133,8 @@ class View:
         else:
             response_type = "in_channel"
 
-        return await self._webhook_client.send(
+        webhook_client = get_webhook_client(self._response_url)
+        return await webhook_client.send(
             text=text, attachments=attachments, blocks=blocks, response_type=response_type, **kwargs
         )
 
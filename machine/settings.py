@@ -22,6 +22,7 @@ def import_settings(settings_module: str = "local_settings") -> Tuple[CaseInsens
         "TZ": "UTC",
         "LOG_HANDLED_MESSAGES": True,
         "FORCE_USER_LOOKUP": False,
+        "USE_RE2": False,
     }
     settings = CaseInsensitiveDict(default_settings)
     try:
@@ -1,31 +1,325 @@
 from __future__ import annotations
 
+import asyncio
+import sqlite3
+from collections import OrderedDict
+from contextlib import suppress
+
 import aiosqlite
 import time
+from structlog.stdlib import get_logger
+
 from machine.storage.backends.base import MachineBaseStorage
-from typing import Any, Mapping
+from typing import Any, Awaitable, Callable, Mapping, Optional, Tuple
+
+logger = get_logger(__name__)
+
+_JOURNAL_MODES = ("DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF")
+
+# All statements the storage runs, kept in one place
+_SQL_CREATE_TABLE = """
+    CREATE TABLE IF NOT EXISTS sm_storage (
+        key TEXT PRIMARY KEY,
+        value BLOB NOT NULL,
+        expires_at INTEGER
+    )
+"""
+# Older versions stored values in a TEXT column. SQLite can't change the type of a column, so the table is rebuilt.
+# The triggers and index of the old table are dropped with it and created again afterwards.
+_SQL_MIGRATE_TABLE = f"""
+    BEGIN;
+    ALTER TABLE sm_storage RENAME TO sm_storage_old;
+    {_SQL_CREATE_TABLE};
+    INSERT INTO sm_storage (key, value, expires_at) SELECT key, value, expires_at FROM sm_storage_old;
+    DROP TABLE sm_storage_old;
+    COMMIT;
+"""
+_SQL_SET = "INSERT OR REPLACE INTO sm_storage (key, value, expires_at) VALUES (?, ?, ?)"
+_SQL_CREATE_EXPIRES_INDEX = (
+    "CREATE INDEX IF NOT EXISTS sm_storage_expires_at ON sm_storage (expires_at) WHERE expires_at IS NOT NULL"
+)
+# Lookups only filter on the primary key, expiry is checked afterwards, so the result can be cached
+_SQL_GET = "SELECT value, expires_at FROM sm_storage WHERE key = ?"
+_SQL_DELETE = "DELETE FROM sm_storage WHERE key = ?"
+# Checking whether a key exists doesn't need its value
+_SQL_HAS = "SELECT expires_at FROM sm_storage WHERE key = ? LIMIT 1"
+# The total size of all keys and values is kept up to date by triggers, so it never has to be calculated by scanning
+# the whole table. Replacing a row deletes the old row, which only fires the delete trigger with recursive triggers on.
+_SQL_CREATE_SIZE_TABLE = """
+    CREATE TABLE IF NOT EXISTS sm_storage_size (
+        id INTEGER PRIMARY KEY CHECK (id = 0),
+        size INTEGER NOT NULL
+    )
+"""
+_SQL_INIT_SIZE = """
+    INSERT OR IGNORE INTO sm_storage_size (id, size)
+    SELECT 0, COALESCE(SUM(LENGTH(CAST(key AS BLOB)) + LENGTH(CAST(value AS BLOB))), 0) FROM sm_storage
+"""
+_SQL_CREATE_SIZE_TRIGGERS = """
+    CREATE TRIGGER IF NOT EXISTS sm_storage_size_insert AFTER INSERT ON sm_storage BEGIN
+        UPDATE sm_storage_size SET size = size + LENGTH(CAST(NEW.key AS BLOB)) + LENGTH(CAST(NEW.value AS BLOB));
+    END;
+    CREATE TRIGGER IF NOT EXISTS sm_storage_size_delete AFTER DELETE ON sm_storage BEGIN
+        UPDATE sm_storage_size SET size = size - LENGTH(CAST(OLD.key AS BLOB)) - LENGTH(CAST(OLD.value AS BLOB));
+    END;
+"""
+_SQL_SIZE = "SELECT size FROM sm_storage_size"
+# Expired rows are never returned, but they are only removed by this statement, which can use the expires_at index
+_SQL_DELETE_EXPIRED = "DELETE FROM sm_storage WHERE expires_at IS NOT NULL AND expires_at <= ?"
+
+# Expiry timestamps are in whole seconds, so reads can use a timestamp that's slightly out of date
+_NOW_GRANULARITY = 0.25
+
+# A stored value and its expiry timestamp, the value is None if the key isn't stored
+_Entry = Tuple[Optional[bytes], Optional[int]]
+# A pending write: key, value (None for deletes), expiry timestamp and the future to resolve once it's committed
+_WriteOp = Tuple[str, Optional[bytes], Optional[int], "asyncio.Future[None]"]
 
 
 class SQLiteStorage(MachineBaseStorage):
     def __init__(self, settings: Mapping[str, Any]):
         super().__init__(settings)
         self._file = settings.get("SQLITE_PATH", "slack-machine-state.db")
+        self._journal_mode = str(settings.get("SQLITE_JOURNAL_MODE", "WAL")).upper()
+        if self._journal_mode not in _JOURNAL_MODES:
+            raise ValueError(f"Invalid SQLITE_JOURNAL_MODE: {self._journal_mode}")
+        self._cache_kb = int(settings.get("SQLITE_CACHE_KB", 64000))
+        self._batch_max_ops = max(int(settings.get("SQLITE_BATCH_MAX_OPS", 500)), 1)
+        self._batch_max_ms = float(settings.get("SQLITE_BATCH_MAX_MS", 0))
+        self._read_cache_size = int(settings.get("SQLITE_READ_CACHE_SIZE", 1024))
+        self._read_cache: OrderedDict[str, _Entry] = OrderedDict()
+        self._in_memory = bool(settings.get("SQLITE_IN_MEMORY", False))
+        self._backup_interval = float(settings.get("SQLITE_BACKUP_INTERVAL", 300))
+        self._disk_conn: aiosqlite.Connection | None = None
+        self._sweep_interval = float(settings.get("SQLITE_SWEEP_INTERVAL", 60))
+        self._periodic_tasks: list[asyncio.Task[None]] = []
+        self._reader_count = max(int(settings.get("SQLITE_READERS", 0)), 0)
+        if self._reader_count and (self._in_memory or self._file == ":memory:" or self._journal_mode != "WAL"):
+            raise ValueError("SQLITE_READERS needs a database file in WAL journal mode")
+        self._readers: list[aiosqlite.Connection] = []
+        self._next_reader = 0
+        # Counts committed write batches, so reads can tell whether a write was committed while they were running
+        self._write_seq = 0
+        self._now_ts = 0
+        self._now_checked = float("-inf")
+        self._writer: asyncio.Task[None] | None = None
+        self._accepting_writes = False
 
     async def close(self) -> None:
+        self._accepting_writes = False
+        for task in self._periodic_tasks:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+        self._periodic_tasks = []
+        if self._writer is not None:
+            # Let the writer commit what's still queued before closing the connection
+            self._write_queue.put_nowait(None)
+            await self._writer
+            self._writer = None
+        # Updates the statistics of the query planner, if the queries that ran since opening the database need it
+        await self.conn.execute("PRAGMA optimize")
+        if self._disk_conn is not None:
+            await self._backup()
+            await self._disk_conn.close()
+            self._disk_conn = None
+        for reader in self._readers:
+            await reader.close()
+        self._readers = []
         await self.conn.close()
 
     async def init(self) -> None:
-        self.conn = await aiosqlite.connect(self._file)
-        self.conn.text_factory = bytes
+        # Autocommit mode, transactions are started explicitly when writing multiple rows
+        if self._in_memory:
+            self.conn = await aiosqlite.connect(":memory:", isolation_level=None)
+            # The database file is only used to restore the data from and to back it up to
+            self._disk_conn = await aiosqlite.connect(self._file)
+            await self._disk_conn.backup(self.conn)
+        else:
+            self.conn = await aiosqlite.connect(self._file, isolation_level=None)
+        await self.conn.execute(f"PRAGMA journal_mode={self._journal_mode}")
+        if self._journal_mode == "WAL":
+            # In WAL mode, the database can't get corrupted when only syncing at checkpoints
+            await self.conn.execute("PRAGMA synchronous=NORMAL")
+        await self._configure(self.conn)
         self.cursor = await self.conn.cursor()
-        await self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS sm_storage (
-                key TEXT PRIMARY KEY,
-                value TEXT NOT NULL,
-                expires_at INTEGER
+        await self.conn.execute("PRAGMA recursive_triggers=ON")
+        await self.cursor.execute(_SQL_CREATE_TABLE)
+        await self._migrate()
+        await self.cursor.execute(_SQL_CREATE_EXPIRES_INDEX)
+        await self.cursor.execute(_SQL_CREATE_SIZE_TABLE)
+        await self.cursor.execute(_SQL_INIT_SIZE)
+        await self.cursor.executescript(_SQL_CREATE_SIZE_TRIGGERS)
+        # Gives the query planner statistics to choose indexes with. The analysis limit keeps this quick on large
+        # databases by only sampling part of each index
+        await self.conn.execute("PRAGMA analysis_limit=400")
+        await self.conn.execute("ANALYZE sm_storage")
+        # In WAL mode, readers on their own connections only see committed writes and don't block the writer
+        for _ in range(self._reader_count):
+            reader = await aiosqlite.connect(self._file)
+            await reader.execute("PRAGMA query_only=ON")
+            await self._configure(reader)
+            self._readers.append(reader)
+        # Without readers, reads share the connection with the writer. They wait while it has a transaction open, so
+        # they never see writes that might still be rolled back
+        self._transaction_lock = asyncio.Lock()
+        self._write_queue: asyncio.Queue[_WriteOp | None] = asyncio.Queue()
+        self._writer = asyncio.create_task(self._process_writes())
+        self._accepting_writes = True
+        if self._sweep_interval > 0:
+            self._start_periodically(self._sweep_interval, self._sweep, "Unable to delete expired keys")
+        if self._disk_conn is not None and self._backup_interval > 0:
+            self._start_periodically(
+                self._backup_interval, self._backup, f"Unable to back up the in-memory database to {self._file}"
             )
-        """)
-        await self.conn.commit()
+
+    async def _configure(self, conn: aiosqlite.Connection) -> None:
+        await conn.execute("PRAGMA temp_store=MEMORY")
+        # A negative cache size is the size in KiB instead of the number of pages
+        await conn.execute(f"PRAGMA cache_size=-{self._cache_kb}")
+        await conn.execute("PRAGMA mmap_size=268435456")
+
+    async def _migrate(self) -> None:
+        async with self.conn.execute("PRAGMA table_info(sm_storage)") as cursor:
+            column_types = {row[1]: row[2] for row in await cursor.fetchall()}
+        if column_types["value"] != "BLOB":
+            logger.info("Migrating the SQLite storage to the current table layout")
+            await self.conn.executescript(_SQL_MIGRATE_TABLE)
+
+    async def _backup(self) -> None:
+        assert self._disk_conn is not None
+        # The lock makes sure no write transaction is open, so the backup only contains committed writes
+        async with self._transaction_lock:
+            await self.conn.backup(self._disk_conn)
+
+    async def _sweep(self) -> None:
+        async with self._transaction_lock:
+            await self.conn.execute(_SQL_DELETE_EXPIRED, (int(time.time()),))
+
+    def _start_periodically(self, interval: float, job: Callable[[], Awaitable[None]], error: str) -> None:
+        async def run() -> None:
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    await job()
+                except sqlite3.Error:
+                    logger.exception(error)
+
+        self._periodic_tasks.append(asyncio.create_task(run()))
+
+    async def _write(self, key: str, value: bytes | None, expires_at: int | None) -> None:
+        if not self._accepting_writes:
+            raise RuntimeError("SQLite storage is not initialized or already closed")
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self._write_queue.put_nowait((key, value, expires_at, future))
+        # Only return once the write is committed, so reads after a write always see it
+        await future
+
+    async def _process_writes(self) -> None:
+        # Writes that are queued together are committed in one transaction, so a burst of writes costs one sync
+        while True:
+            op = await self._write_queue.get()
+            if op is None:
+                return
+            batch = [op]
+            closing = await self._collect_batch(batch)
+            await self._commit_batch(batch)
+            if closing:
+                return
+
+    async def _collect_batch(self, batch: list[_WriteOp]) -> bool:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._batch_max_ms / 1000
+        while len(batch) < self._batch_max_ops:
+            try:
+                op = self._write_queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    op = await asyncio.wait_for(self._write_queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            if op is None:
+                return True
+            batch.append(op)
+        return False
+
+    async def _commit_batch(self, batch: list[_WriteOp]) -> None:
+        # Only the last write for each key matters
+        latest = {key: (value, expires_at) for key, value, expires_at, _ in batch}
+        upserts = [(key, value, expires_at) for key, (value, expires_at) in latest.items() if value is not None]
+        deletes = [(key,) for key, (value, _) in latest.items() if value is None]
+        async with self._transaction_lock:
+            try:
+                # A single write commits by itself, which saves a round-trip to the database thread
+                if len(latest) > 1:
+                    await self.conn.execute("BEGIN")
+                if upserts:
+                    await self.conn.executemany(_SQL_SET, upserts)
+                if deletes:
+                    await self.conn.executemany(_SQL_DELETE, deletes)
+                if self.conn.in_transaction:
+                    await self.conn.execute("COMMIT")
+            except Exception as e:
+                for *_, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                if self.conn.in_transaction:
+                    with suppress(sqlite3.Error):
+                        await self.conn.execute("ROLLBACK")
+            else:
+                self._write_seq += 1
+                for key, (value, expires_at) in latest.items():
+                    self._cache_entry(key, (value, expires_at))
+                for *_, future in batch:
+                    if not future.done():
+                        future.set_result(None)
+
+    def _cache_entry(self, key: str, entry: _Entry) -> None:
+        if self._read_cache_size <= 0:
+            return
+        self._read_cache[key] = entry
+        self._read_cache.move_to_end(key)
+        if len(self._read_cache) > self._read_cache_size:
+            self._read_cache.popitem(last=False)
+
+    def _cached_entry(self, key: str) -> _Entry | None:
+        entry = self._read_cache.get(key)
+        if entry is not None:
+            self._read_cache.move_to_end(key)
+        return entry
+
+    async def _lookup(self, key: str) -> _Entry:
+        entry = self._cached_entry(key)
+        if entry is not None:
+            return entry
+        write_seq = self._write_seq
+        row = await self._fetchone(_SQL_GET, (key,))
+        entry = (row[0], row[1]) if row else (None, None)
+        # A write that was committed while reading might not be in the result, and it's already in the cache
+        if write_seq == self._write_seq:
+            self._cache_entry(key, entry)
+        return entry
+
+    async def _fetchone(self, sql: str, parameters: tuple[Any, ...]) -> sqlite3.Row | None:
+        # Executing and fetching in one call takes a single trip to the database thread
+        if self._readers:
+            reader = self._readers[self._next_reader % len(self._readers)]
+            self._next_reader += 1
+            rows = await reader.execute_fetchall(sql, parameters)
+        else:
+            async with self._transaction_lock:
+                rows = await self.conn.execute_fetchall(sql, parameters)
+        return next(iter(rows), None)
+
+    def _now(self) -> int:
+        checked = time.monotonic()
+        if checked - self._now_checked > _NOW_GRANULARITY:
+            self._now_ts = int(time.time())
+            self._now_checked = checked
+        return self._now_ts
 
     async def set(self, key: str, value: bytes, expires: int | None = None) -> None:
         current_ts = int(time.time())
@@ -34,50 +328,44 @@ class SQLiteStorage(MachineBaseStorage):
         else:
             expires_at = None
 
-        await self.cursor.execute(
-            """
-            INSERT OR REPLACE INTO sm_storage (key, value, expires_at)
-            VALUES (?, ?, ?)
-        """,
-            (key, value, expires_at),
-        )
-        await self.conn.commit()
+        await self._write(key, value, expires_at)
 
     async def get(self, key: str) -> bytes | None:
-        current_ts = int(time.time())
-        await self.cursor.execute(
-            "SELECT value FROM sm_storage WHERE key=? AND (expires_at > ? OR expires_at IS NULL)", (key, current_ts)
-        )
-        row = await self.cursor.fetchone()
-        return row[0] if row else None
+        value, expires_at = await self._lookup(key)
+        if value is None or _expired(expires_at, self._now()):
+            return None
+        return value
 
-    async def get_expire(self, key: str) -> bytes | None:
-        current_ts = int(time.time())
-        await self.cursor.execute(
-            "SELECT expires_at FROM sm_storage WHERE key = ? AND (expires_at > ? OR expires_at IS NULL)",
-            (key, current_ts),
-        )
-        row = await self.cursor.fetchone()
-        return row[0] if row else None
+    async def get_expire(self, key: str) -> int | None:
+        value, expires_at = await self._lookup(key)
+        if value is None or _expired(expires_at, self._now()):
+            return None
+        return expires_at
 
     async def delete(self, key: str) -> None:
-        await self.cursor.execute("DELETE FROM sm_storage WHERE key = ?", (key,))
-        await self.conn.commit()
+        await self._write(key, None, None)
 
     async def has(self, key: str) -> bool:
-        current_ts = int(time.time())
-        await self.cursor.execute(
-            "SELECT EXISTS(SELECT 1 FROM sm_storage WHERE key = ? AND (expires_at > ? OR expires_at IS NULL))",
-            (key, current_ts),
-        )
-        result = await self.cursor.fetchone()
-        if result is not None:
-            return result[0]
-        return False
+        entry = self._cached_entry(key)
+        if entry is None:
+            write_seq = self._write_seq
+            row = await self._fetchone(_SQL_HAS, (key,))
+            # Only a missing key can be cached, the value of an existing key wasn't read
+            if row is None and write_seq == self._write_seq:
+                self._cache_entry(key, (None, None))
+            if row is None:
+                return False
+            expires_at = row[0]
+        else:
+            value, expires_at = entry
+            if value is None:
+                return False
+        return not _expired(expires_at, self._now())
 
     async def size(self) -> int:
-        await self.cursor.execute("SELECT payload FROM dbstat WHERE name = 'sm_storage' AND aggregate = TRUE")
-        result = await self.cursor.fetchone()
-        if result is not None:
-            return result[0]
-        return 0
+        row = await self._fetchone(_SQL_SIZE, ())
+        return row[0] if row else 0
+
+
+def _expired(expires_at: int | None, current_ts: int) -> bool:
+    return expires_at is not None and expires_at <= current_ts
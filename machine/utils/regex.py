@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import re
+from typing import Iterable, cast
+
+try:
+    import re2
+except ImportError:  # pragma: no cover
+    re2 = None
+
+# Inline flags that can be scoped to a single alternative of a combined pattern
+_SCOPED_FLAGS = ((re.IGNORECASE, "i"), (re.MULTILINE, "m"), (re.DOTALL, "s"), (re.VERBOSE, "x"), (re.ASCII, "a"))
+
+_NAMED_GROUP = re.compile(r"(?<!\\)\(\?P<\w+>")
+# Global inline flags, e.g. "(?i)". Their effect is already reflected in ``Pattern.flags``
+_GLOBAL_FLAGS = re.compile(r"(?<!\\)\(\?[aiLmsux]+\)")
+# Back-references and conditionals refer to groups by number or name, which breaks once patterns are combined
+_GROUP_REFERENCE = re.compile(r"\\\d|\(\?P=|\(\?\(")
+
+# re2 only supports the inline flags i, m and s
+_RE2_FLAGS = ((re.IGNORECASE, "i"), (re.MULTILINE, "m"), (re.DOTALL, "s"))
+# Character class shorthands are ASCII-only in re2, while they match any Unicode character in Python
+_UNICODE_SHORTHAND = re.compile(r"(?<!\\)\\[wWdDsSbB]")
+
+
+def combine_patterns(patterns: Iterable[re.Pattern[str]]) -> re.Pattern[str] | None:
+    """Combine multiple patterns into one pattern that matches if any of them matches
+
+    The combined pattern is meant to be used as a pre-filter: if it doesn't find a match, none of
+    the individual patterns will. Named groups are turned into non-capturing groups, so the combined
+    pattern can't be used to extract matched values.
+
+    :param patterns: the compiled patterns to combine
+    :return: the combined pattern, or ``None`` if the patterns can't be safely combined
+    """
+    alternatives = []
+    for pattern in patterns:
+        source = pattern.pattern
+        if _GROUP_REFERENCE.search(source):
+            return None
+        # Global flags at the start are replaced by scoped flags, anywhere else they would apply to all alternatives
+        leading_flags = _GLOBAL_FLAGS.match(source)
+        if leading_flags:
+            source = source[leading_flags.end() :]
+        if _GLOBAL_FLAGS.search(source):
+            return None
+        flags = "".join(letter for flag, letter in _SCOPED_FLAGS if pattern.flags & flag)
+        alternatives.append(f"(?{flags}:{_NAMED_GROUP.sub('(?:', source)})")
+    if not alternatives:
+        return None
+    try:
+        return re.compile("|".join(alternatives))
+    except re.error:
+        return None
+
+
+def re2_available() -> bool:
+    """Check if the linear-time re2 regex engine is installed
+
+    :return: ``True/False`` whether re2 is available
+    """
+    return re2 is not None
+
+
+def compile_re2(pattern: re.Pattern[str]) -> re.Pattern[str] | None:
+    """Compile a pattern with the linear-time re2 regex engine
+
+    re2 guarantees matching time linear in the length of the text, but doesn't support all features of
+    Python's regex engine, such as back-references and lookaround assertions. Patterns that use such features,
+    or that would match differently in re2, can't be converted.
+
+    :param pattern: the pattern to convert
+    :return: an re2 pattern that can be used in place of the original pattern for searching, or ``None`` if
+        re2 is not installed or the pattern can't be converted
+    """
+    if re2 is None:
+        return None
+    supported_flags = re.ASCII | re.UNICODE
+    for flag, _ in _RE2_FLAGS:
+        supported_flags |= flag
+    if pattern.flags & ~supported_flags:
+        return None
+    if not pattern.flags & re.ASCII and _UNICODE_SHORTHAND.search(pattern.pattern):
+        return None
+    flags = "".join(letter for flag, letter in _RE2_FLAGS if pattern.flags & flag)
+    options = re2.Options()
+    options.log_errors = False
+    try:
+        compiled = re2.compile(f"(?{flags}:{pattern.pattern})" if flags else pattern.pattern, options)
+    except re2.error:
+        return None
+    # re2 patterns provide the same search() and Match.groupdict() API that message dispatch relies on
+    return cast("re.Pattern[str]", compiled)
+
+
+def has_multiple_wildcards(pattern: re.Pattern[str]) -> bool:
+    """Check if a pattern contains more than one ``.*``
+
+    Multiple unbounded wildcards in one pattern can make backtracking regex engines very slow on long texts.
+
+    :param pattern: the pattern to check
+    :return: ``True/False`` whether the pattern contains more than one ``.*``
+    """
+    return pattern.pattern.count(".*") > 1
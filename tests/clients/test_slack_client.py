@@ -253,3 +253,22 @@ async def test_get_user_by_email(slack_client, socket_mode_client, user_dict):
     req_with_email = create_req(event_with_email)
     await slack_client._process_users_channels(socket_mode_client, req_with_email)
     assert slack_client.get_user_by_email("john@my-team.org") == User.model_validate(user_dict)
+
+
+@pytest.mark.asyncio
+async def test_views_open(slack_client, web_client, mocker):
+    mocker.patch("machine.clients.slack.orjson", None)
+    await slack_client.views_open("trigger-1", view={"type": "modal"})
+    web_client.views_open.assert_called_once_with(trigger_id="trigger-1", view={"type": "modal"})
+
+
+@pytest.mark.asyncio
+async def test_views_open_orjson(slack_client, web_client):
+    pytest.importorskip("orjson")
+    await slack_client.views_open("trigger-1", view={"type": "modal"}, external_id=None)
+    web_client.views_open.assert_not_called()
+    web_client.api_call.assert_called_once_with(
+        "views.open",
+        data=b'{"trigger_id":"trigger-1","view":{"type":"modal"}}',
+        headers={"Content-Type": "application/json;charset=utf-8"},
+    )
@@ -0,0 +1,21 @@
+import pytest
+
+from machine.clients.webhook import close_webhook_session, get_webhook_client
+
+
+@pytest.mark.asyncio
+async def test_get_webhook_client():
+    client = get_webhook_client("https://my.webhook.com/1")
+    assert client.url == "https://my.webhook.com/1"
+    assert get_webhook_client("https://my.webhook.com/1") is client
+    other_client = get_webhook_client("https://my.webhook.com/2")
+    assert other_client is not client
+    # all clients share the same session
+    assert other_client.session is client.session
+    assert client.session.timeout.total == client.timeout
+    await close_webhook_session()
+    assert client.session.closed
+    new_client = get_webhook_client("https://my.webhook.com/1")
+    assert new_client is not client
+    assert not new_client.session.closed
+    await close_webhook_session()
@@ -1,3 +1,6 @@
+import asyncio
+import sqlite3
+
 import pytest
 
 from machine.storage.backends.sqlite import SQLiteStorage
@@ -37,10 +40,12 @@ async def test_delete(sqlite_storage: SQLiteStorage):
 async def test_expire_values(sqlite_storage: SQLiteStorage, mocker):
     mocked_time = mocker.patch("machine.storage.backends.sqlite.time", autospec=True)
     mocked_time.time.return_value = 44046732
+    mocked_time.monotonic.return_value = 1000.0
     await sqlite_storage.set("key1", b"value1", expires=15)
     assert await sqlite_storage.get_expire("key1") == 44046732 + 15
     assert await sqlite_storage.get("key1") == b"value1"
     mocked_time.time.return_value = 44046732 + 20
+    mocked_time.monotonic.return_value = 1000.0 + 20
     assert await sqlite_storage.get("key1") is None
 
 
@@ -49,4 +54,234 @@ async def test_size(sqlite_storage: SQLiteStorage):
     assert await sqlite_storage.size() == 0
     await sqlite_storage.set("test_key_1", "test_value_1")
     await sqlite_storage.set("test_key_2", "test_value_2")
-    assert await sqlite_storage.size() > 44  # number of characters in both columns for both rows
+    assert await sqlite_storage.size() == 44  # number of characters in both columns for both rows
+    await sqlite_storage.set("test_key_1", "value_1")
+    assert await sqlite_storage.size() == 39
+    await sqlite_storage.delete("test_key_2")
+    await sqlite_storage.delete("test_key_2")
+    assert await sqlite_storage.size() == 17
+
+
+@pytest.mark.asyncio
+async def test_size_on_init(tmp_path):
+    settings = {"SQLITE_PATH": str(tmp_path / "state.db")}
+    storage = SQLiteStorage(settings)
+    await storage.init()
+    await storage.set("test_key_1", b"test_value_1")
+    await storage.close()
+    storage = SQLiteStorage(settings)
+    await storage.init()
+    assert await storage.size() == 22
+    await storage.close()
+
+
+@pytest.mark.asyncio
+async def test_migrate_text_values(tmp_path):
+    path = str(tmp_path / "state.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE sm_storage (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at INTEGER)")
+        conn.execute("INSERT INTO sm_storage VALUES (?, ?, NULL)", ("test_key_1", b"test_value_1"))
+    conn.close()
+    storage = SQLiteStorage({"SQLITE_PATH": path})
+    await storage.init()
+    async with storage.conn.execute("SELECT type FROM pragma_table_info('sm_storage') WHERE name = 'value'") as cursor:
+        assert (await cursor.fetchone())[0] == "BLOB"
+    assert await storage.get("test_key_1") == b"test_value_1"
+    assert await storage.size() == 22
+    await storage.set("test_key_2", b"test_value_2")
+    assert await storage.size() == 44
+    await storage.close()
+
+
+@pytest.mark.asyncio
+async def test_pragmas(tmp_path):
+    storage = SQLiteStorage({"SQLITE_PATH": str(tmp_path / "state.db"), "SQLITE_CACHE_KB": "2000"})
+    await storage.init()
+    async with storage.conn.execute("PRAGMA journal_mode") as cursor:
+        assert (await cursor.fetchone())[0] == "wal"
+    async with storage.conn.execute("PRAGMA cache_size") as cursor:
+        assert (await cursor.fetchone())[0] == -2000
+    await storage.close()
+
+
+def test_invalid_journal_mode():
+    with pytest.raises(ValueError):
+        SQLiteStorage({"SQLITE_JOURNAL_MODE": "FAST"})
+
+
+@pytest.mark.asyncio
+async def test_batched_writes(sqlite_storage: SQLiteStorage, mocker):
+    execute_spy = mocker.spy(sqlite_storage.conn, "execute")
+    await asyncio.gather(
+        sqlite_storage.set("key1", b"value1"),
+        sqlite_storage.set("key2", b"value2"),
+        sqlite_storage.set("key1", b"value3"),
+        sqlite_storage.delete("key2"),
+    )
+    # all writes were committed in one transaction, and the last write for each key wins
+    statements = [call.args[0] for call in execute_spy.call_args_list]
+    assert [statement for statement in statements if statement in ("BEGIN", "COMMIT")] == ["BEGIN", "COMMIT"]
+    assert await sqlite_storage.get("key1") == b"value3"
+    assert not await sqlite_storage.has("key2")
+
+
+@pytest.mark.asyncio
+async def test_single_write_autocommits(sqlite_storage: SQLiteStorage, mocker):
+    execute_spy = mocker.spy(sqlite_storage.conn, "execute")
+    await sqlite_storage.set("key1", b"value1")
+    assert not sqlite_storage.conn.in_transaction
+    assert "BEGIN" not in [call.args[0] for call in execute_spy.call_args_list]
+    assert await sqlite_storage.get("key1") == b"value1"
+
+
+@pytest.mark.asyncio
+async def test_write_after_close():
+    storage = SQLiteStorage({"SQLITE_PATH": ":memory:"})
+    await storage.init()
+    await storage.close()
+    with pytest.raises(RuntimeError):
+        await storage.set("key1", b"value1")
+
+
+@pytest.mark.asyncio
+async def test_read_cache(sqlite_storage: SQLiteStorage, mocker):
+    await sqlite_storage.set("key1", b"value1")
+    execute_spy = mocker.spy(sqlite_storage.conn, "execute_fetchall")
+    assert await sqlite_storage.get("key1") == b"value1"
+    assert await sqlite_storage.has("key1")
+    assert not await sqlite_storage.has("key2")
+    assert not await sqlite_storage.has("key2")
+    # key1 was cached when it was written, key2 only needed one lookup
+    assert execute_spy.call_count == 1
+    await sqlite_storage.delete("key1")
+    assert not await sqlite_storage.has("key1")
+    await sqlite_storage.set("key2", b"value2")
+    assert await sqlite_storage.get("key2") == b"value2"
+    assert execute_spy.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_read_cache_eviction():
+    storage = SQLiteStorage({"SQLITE_PATH": ":memory:", "SQLITE_READ_CACHE_SIZE": 2})
+    await storage.init()
+    await storage.set("key1", b"value1")
+    await storage.set("key2", b"value2")
+    await storage.get("key1")
+    await storage.set("key3", b"value3")
+    # key2 was the least recently used
+    assert list(storage._read_cache) == ["key1", "key3"]
+    assert await storage.get("key2") == b"value2"
+    await storage.close()
+
+
+@pytest.mark.asyncio
+async def test_in_memory(tmp_path):
+    settings = {"SQLITE_PATH": str(tmp_path / "state.db"), "SQLITE_IN_MEMORY": True}
+    storage = SQLiteStorage(settings)
+    await storage.init()
+    await storage.set("test_key_1", b"test_value_1")
+    await storage.close()
+    # the data was backed up to disk when closing
+    storage = SQLiteStorage({"SQLITE_PATH": settings["SQLITE_PATH"]})
+    await storage.init()
+    assert await storage.get("test_key_1") == b"test_value_1"
+    await storage.close()
+    # and restored into memory, including the size bookkeeping
+    storage = SQLiteStorage(settings)
+    await storage.init()
+    assert await storage.get("test_key_1") == b"test_value_1"
+    await storage.set("test_key_2", b"test_value_2")
+    assert await storage.size() == 44
+    await storage.close()
+
+
+@pytest.mark.asyncio
+async def test_in_memory_periodic_backup(tmp_path):
+    settings = {"SQLITE_PATH": str(tmp_path / "state.db"), "SQLITE_IN_MEMORY": True, "SQLITE_BACKUP_INTERVAL": 0.01}
+    storage = SQLiteStorage(settings)
+    await storage.init()
+    await storage.set("test_key_1", b"test_value_1")
+    await asyncio.sleep(0.1)
+    # the data is on disk before closing
+    with sqlite3.connect(settings["SQLITE_PATH"]) as disk_conn:
+        assert disk_conn.execute("SELECT value FROM sm_storage").fetchall() == [(b"test_value_1",)]
+    await storage.close()
+
+
+@pytest.mark.asyncio
+async def test_has_without_read_cache(mocker):
+    mocked_time = mocker.patch("machine.storage.backends.sqlite.time", autospec=True)
+    mocked_time.time.return_value = 44046732
+    mocked_time.monotonic.return_value = 1000.0
+    storage = SQLiteStorage({"SQLITE_PATH": ":memory:", "SQLITE_READ_CACHE_SIZE": 0})
+    await storage.init()
+    await storage.set("key1", b"value1", expires=15)
+    assert await storage.has("key1")
+    assert not await storage.has("key2")
+    mocked_time.time.return_value = 44046732 + 20
+    mocked_time.monotonic.return_value = 1000.0 + 20
+    assert not await storage.has("key1")
+    await storage.close()
+
+
+@pytest.mark.asyncio
+async def test_readers(tmp_path):
+    storage = SQLiteStorage({"SQLITE_PATH": str(tmp_path / "state.db"), "SQLITE_READERS": 2})
+    await storage.init()
+    assert len(storage._readers) == 2
+    await storage.set("key1", b"value1")
+    storage._read_cache.clear()
+    assert await storage.get("key1") == b"value1"
+    assert await storage.has("key1")
+    assert await storage.size() == 10
+    with pytest.raises(sqlite3.OperationalError):
+        await storage._readers[0].execute("DELETE FROM sm_storage")
+    await storage.close()
+
+
+def test_readers_need_wal():
+    with pytest.raises(ValueError):
+        SQLiteStorage({"SQLITE_PATH": ":memory:", "SQLITE_READERS": 2})
+
+
+def test_now_is_cached(mocker):
+    mocked_time = mocker.patch("machine.storage.backends.sqlite.time", autospec=True)
+    mocked_time.time.return_value = 44046732
+    mocked_time.monotonic.return_value = 1000.0
+    storage = SQLiteStorage({"SQLITE_PATH": ":memory:"})
+    assert storage._now() == 44046732
+    mocked_time.time.return_value = 44046733
+    mocked_time.monotonic.return_value = 1000.1
+    assert storage._now() == 44046732
+    mocked_time.monotonic.return_value = 1000.3
+    assert storage._now() == 44046733
+    assert mocked_time.time.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_analyze_and_optimize(tmp_path, mocker):
+    storage = SQLiteStorage({"SQLITE_PATH": str(tmp_path / "state.db")})
+    await storage.init()
+    async with storage.conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'sqlite_stat1'") as cursor:
+        assert (await cursor.fetchone())[0] == 1
+    execute_spy = mocker.spy(storage.conn, "execute")
+    await storage.close()
+    assert "PRAGMA optimize" in [call.args[0] for call in execute_spy.call_args_list]
+
+
+@pytest.mark.asyncio
+async def test_sweep_expired(mocker):
+    storage = SQLiteStorage({"SQLITE_PATH": ":memory:", "SQLITE_SWEEP_INTERVAL": 0.01})
+    await storage.init()
+    mocked_time = mocker.patch("machine.storage.backends.sqlite.time", autospec=True)
+    mocked_time.time.return_value = 44046732
+    mocked_time.monotonic.return_value = 1000.0
+    await storage.set("key1", b"value1", expires=15)
+    await storage.set("key2", b"value2")
+    mocked_time.time.return_value = 44046732 + 20
+    await asyncio.sleep(0.1)
+    # the expired row is gone, and it's no longer counted in the size
+    async with storage.conn.execute("SELECT key FROM sm_storage") as cursor:
+        assert await cursor.fetchall() == [("key2",)]
+    assert await storage.size() == 10
+    await storage.close()
@@ -19,6 +19,8 @@ from machine.handlers import (
     generate_message_matcher,
     handle_message,
     create_generic_event_handler,
+    create_message_handler,
+    create_request_dispatcher,
     create_slash_command_handler,
     log_request,
 )
@@ -123,6 +125,8 @@ def test_generate_message_matcher():
     assert generate_message_matcher(two_aliases_settings) == re.compile(
         rf"^(?:<@(?P<atuser>\w+)>:?|(?P<username>\w+):|(?P<alias>!|{re.escape('$')})) ?(?P<text>.*)$", re.DOTALL
     )
+    # matchers are compiled once per set of aliases
+    assert generate_message_matcher({"ALIASES": "!"}) is generate_message_matcher(one_alias_settings)
 
 
 def test_check_bot_mention():
@@ -158,6 +162,18 @@ def test_check_bot_mention():
     event = _check_bot_mention(mention_msg_event_dm_with_user, bot_name, bot_id, message_matcher)
     assert event == {"text": "hi", "channel_type": "im", "type": "message", "user": "user1"}
 
+    mention_msg_event_dm_with_username = _gen_msg_event("superbot: hi", channel_type="im")
+    event = _check_bot_mention(mention_msg_event_dm_with_username, bot_name, bot_id, message_matcher)
+    assert event == {"text": "hi", "channel_type": "im", "type": "message", "user": "user1"}
+
+    mention_msg_event_dm_with_alias = _gen_msg_event("!hi", channel_type="im")
+    event = _check_bot_mention(mention_msg_event_dm_with_alias, bot_name, bot_id, message_matcher)
+    assert event == {"text": "hi", "channel_type": "im", "type": "message", "user": "user1"}
+
+    mention_msg_event_dm_with_alias = _gen_msg_event("!hi", channel_type="im")
+    event = _check_bot_mention(mention_msg_event_dm_with_alias, bot_name, bot_id, message_matcher, ("!", "$"))
+    assert event == {"text": "hi", "channel_type": "im", "type": "message", "user": "user1"}
+
     mention_msg_event_alias_1 = _gen_msg_event("!hi")
     event = _check_bot_mention(mention_msg_event_alias_1, bot_name, bot_id, message_matcher)
     assert event == {"text": "hi", "channel_type": "channel", "type": "message", "user": "user1"}
@@ -171,6 +187,18 @@ def test_check_bot_mention():
     assert event is None
 
 
+def test_check_bot_mention_dm_with_word_alias():
+    message_matcher = generate_message_matcher({"ALIASES": "hey,!"})
+    event = _check_bot_mention(
+        _gen_msg_event("hey do it", channel_type="im"), "superbot", "123", message_matcher, ("hey", "!")
+    )
+    assert event["text"] == "do it"
+    event = _check_bot_mention(
+        _gen_msg_event("hi there", channel_type="im"), "superbot", "123", message_matcher, ("hey", "!")
+    )
+    assert event["text"] == "hi there"
+
+
 def _assert_message(args, text):
     # called with 1 positional arg and 0 kw args
     assert len(args[0]) == 1
@@ -187,7 +215,7 @@ async def test_handle_message_listen_to(plugin_actions, fake_plugin, slack_clien
     bot_id = "123"
     msg_event = _gen_msg_event("hi")
 
-    await handle_message(msg_event, bot_name, bot_id, plugin_actions, message_matcher, slack_client, True)
+    await handle_message(msg_event, bot_name, bot_id, plugin_actions, message_matcher, slack_client, True, False)
     assert fake_plugin.listen_function.call_count == 1
     assert fake_plugin.respond_function.call_count == 0
     args = fake_plugin.listen_function.call_args
@@ -199,13 +227,27 @@ async def test_handle_message_respond_to(plugin_actions, fake_plugin, slack_clie
     bot_name = "superbot"
     bot_id = "123"
     msg_event = _gen_msg_event("<@123> hello")
-    await handle_message(msg_event, bot_name, bot_id, plugin_actions, message_matcher, slack_client, True)
+    await handle_message(msg_event, bot_name, bot_id, plugin_actions, message_matcher, slack_client, True, False)
     assert fake_plugin.respond_function.call_count == 1
     assert fake_plugin.listen_function.call_count == 0
     args = fake_plugin.respond_function.call_args
     _assert_message(args, "hello")
 
 
+@pytest.mark.asyncio
+async def test_handle_message_force_user_lookup(plugin_actions, fake_plugin, slack_client, message_matcher):
+    bot_name = "superbot"
+    bot_id = "123"
+    msg_event = _gen_msg_event("<@123> hi, hello")
+    await handle_message(msg_event, bot_name, bot_id, plugin_actions, message_matcher, slack_client, True, True)
+    assert fake_plugin.respond_function.call_count == 1
+    assert fake_plugin.listen_function.call_count == 1
+    # user is looked up once, no matter how many handlers match
+    slack_client.get_user.assert_awaited_once_with("user1")
+    # both handlers receive the same message
+    assert fake_plugin.respond_function.call_args.args[0] is fake_plugin.listen_function.call_args.args[0]
+
+
 @pytest.mark.asyncio
 async def test_handle_message_changed(plugin_actions, fake_plugin, slack_client, message_matcher):
     bot_name = "superbot"
@@ -220,7 +262,7 @@ async def test_handle_message_changed(plugin_actions, fake_plugin, slack_client,
         "channel_type": "channel",
         "channel": "C123",
     }
-    await handle_message(msg_event, bot_name, bot_id, plugin_actions, message_matcher, slack_client, True)
+    await handle_message(msg_event, bot_name, bot_id, plugin_actions, message_matcher, slack_client, True, False)
     assert fake_plugin.respond_function.call_count == 0
     assert fake_plugin.listen_function.call_count == 1
     args = fake_plugin.listen_function.call_args
@@ -244,6 +286,17 @@ async def test_create_generic_event_handler(plugin_actions, fake_plugin, socket_
     assert args[0][0] == {"type": "some_event", "foo": "bar"}
 
 
+@pytest.mark.asyncio
+async def test_create_message_handler_without_listeners(mocker, socket_mode_client, slack_client):
+    handle_message_mock = mocker.patch("machine.handlers.handle_message")
+    settings = {"LOG_HANDLED_MESSAGES": True, "FORCE_USER_LOOKUP": False}
+    handler = create_message_handler(RegisteredActions(), settings, "123", "superbot", slack_client)
+    await handler(socket_mode_client, _gen_event_request("message"))
+    # the request is acknowledged, but not processed
+    socket_mode_client.send_socket_mode_response.assert_called_once()
+    handle_message_mock.assert_not_called()
+
+
 def _gen_command_request(command: str, text: str):
     payload = {"command": command, "text": text, "response_url": "https://my.webhook.com"}
     return SocketModeRequest(type="slash_commands", envelope_id="x", payload=payload)
@@ -290,6 +343,23 @@ async def test_create_slash_command_handler_generator(plugin_actions, fake_plugi
     assert fake_plugin.command_function.call_count == 0
 
 
+@pytest.mark.asyncio
+async def test_create_request_dispatcher(plugin_actions, fake_plugin, socket_mode_client, slack_client):
+    settings = {"LOG_HANDLED_MESSAGES": True, "FORCE_USER_LOOKUP": False}
+    dispatcher = create_request_dispatcher(plugin_actions, settings, "123", "superbot", slack_client)
+    await dispatcher(socket_mode_client, _gen_event_request("some_event"))
+    assert fake_plugin.process_function.call_count == 1
+    # events are acknowledged once
+    socket_mode_client.send_socket_mode_response.assert_called_once()
+    await dispatcher(socket_mode_client, _gen_command_request("/test", "foo"))
+    assert fake_plugin.command_function.call_count == 1
+    # requests without a route are ignored
+    await dispatcher(socket_mode_client, SocketModeRequest(type="hello", envelope_id="y", payload={}))
+    assert socket_mode_client.send_socket_mode_response.call_count == 2
+    await dispatcher(socket_mode_client, _gen_event_request("message"))
+    assert socket_mode_client.send_socket_mode_response.call_count == 3
+
+
 @pytest.mark.asyncio
 async def test_request_logger_handler(socket_mode_client):
     with capture_logs() as cap_logs:
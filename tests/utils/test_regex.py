@@ -0,0 +1,50 @@
+import re
+
+import pytest
+
+from machine.utils.regex import combine_patterns, compile_re2, has_multiple_wildcards
+
+
+def test_combine_patterns():
+    combined = combine_patterns(
+        [re.compile(r"^grant (?P<role>\w+)$"), re.compile(r"revoke (?P<role>\w+)"), re.compile("hi", re.IGNORECASE)]
+    )
+    assert combined is not None
+    assert combined.search("grant admin")
+    assert combined.search("please revoke admin")
+    assert combined.search("HI there")
+    assert not combined.search("please grant admin")
+    assert not combined.search("hello")
+
+
+def test_combine_patterns_not_combinable():
+    assert combine_patterns([]) is None
+    assert combine_patterns([re.compile(r"(a)\1"), re.compile("b")]) is None
+    assert combine_patterns([re.compile(r"(?P<x>a)(?P=x)")]) is None
+
+
+def test_combine_patterns_global_flags():
+    combined = combine_patterns([re.compile(r"(?i)hello"), re.compile("bye")])
+    assert combined is not None
+    assert combined.search("HELLO")
+    # the flag only applies to the pattern it was set on
+    assert not combined.search("BYE")
+
+
+def test_compile_re2():
+    pytest.importorskip("re2")
+    compiled = compile_re2(re.compile(r"^grant (?P<role>[a-z]+)$", re.IGNORECASE))
+    assert compiled is not None
+    assert compiled.search("GRANT admin").groupdict() == {"role": "admin"}
+    assert compiled.search("please grant admin") is None
+    # Unicode aware character class shorthands match differently in re2
+    assert compile_re2(re.compile(r"grant (?P<role>\w+)")) is None
+    assert compile_re2(re.compile(r"grant (?P<role>\w+)", re.ASCII)) is not None
+    # lookarounds are not supported by re2
+    assert compile_re2(re.compile(r"grant(?= admin)")) is None
+    assert compile_re2(re.compile(r"grant", re.VERBOSE)) is None
+
+
+def test_has_multiple_wildcards():
+    assert not has_multiple_wildcards(re.compile(r"^image (.*)$"))
+    assert has_multiple_wildcards(re.compile(r"(.*) loves (.*)"))